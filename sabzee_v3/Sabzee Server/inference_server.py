@@ -0,0 +1,99 @@
+"""Serve the plant disease and yield prediction APIs from a single process.
+
+Both Flask apps are mounted under their own prefix:
+
+    /disease/predict, /disease/health   -> plant_disease_api
+    /yield/predict, /yield/health       -> yield_prediction_api
+    /health, /metrics                   -> combined status
+
+Running both models in one interpreter avoids loading Python, numpy and the
+logging stack twice. The services keep separate inference pools (see
+ml_common/pools.py) but share the HTTP connection pool and metrics.
+"""
+import importlib.util
+import logging
+import os
+import sys
+from flask import Flask, jsonify
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from ml_common import metrics, threads
+threads.apply_env_thread_limits()
+from ml_common.pools import TORCH_POOL, SKLEARN_POOL
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INFERENCE_PORT = int(os.environ.get('INFERENCE_PORT', '5003'))
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', '8'))
+
+def load_service(name, directory):
+    """Import a service's app.py under a unique module name.
+
+    Both services have their own `model` module, so it is imported with the
+    service directory on sys.path and then renamed before loading the next one.
+    """
+    sys.path.insert(0, directory)
+    sys.modules.pop('model', None)
+    try:
+        spec = importlib.util.spec_from_file_location(f"{name}_app", os.path.join(directory, 'app.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[f"{name}_app"] = module
+        sys.modules[f"{name}_model"] = sys.modules.pop('model')
+    finally:
+        sys.path.remove(directory)
+    return module
+
+disease_service = load_service('plant_disease', os.path.join(BASE_DIR, 'plant_disease_api'))
+yield_service = load_service('yield_prediction', os.path.join(BASE_DIR, 'yield_prediction_api'))
+
+root_app = Flask(__name__)
+
+@root_app.route('/health', methods=['GET'])
+def health_check():
+    return jsonify({
+        "status": "healthy",
+        "services": {
+            "disease": {"using_mock": disease_service.use_mock},
+            "yield": {"using_mock": yield_service.yield_model.is_mock if yield_service.yield_model else True}
+        },
+        "pools": {
+            TORCH_POOL.name: TORCH_POOL.size,
+            SKLEARN_POOL.name: SKLEARN_POOL.size
+        },
+        "threads": threads.thread_report()
+    }), 200
+
+@root_app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return jsonify(metrics.snapshot()), 200
+
+application = DispatcherMiddleware(root_app, {
+    '/disease': disease_service.app,
+    '/yield': yield_service.app
+})
+
+def main():
+    # Load both models up front instead of on the first request to each service
+    disease_service.load_model_before_first_request()
+    yield_service.load_model_before_first_request()
+
+    try:
+        from waitress import serve
+    except ImportError:
+        # waitress is listed in requirements-inference.txt; this is only for incomplete installs
+        logger.error("waitress is not installed (pip install -r requirements-inference.txt), "
+                     "falling back to the werkzeug development server, which is not meant for production")
+        from werkzeug.serving import run_simple
+        run_simple('0.0.0.0', INFERENCE_PORT, application, threaded=True)
+        return
+    
+    logger.info(f"Starting co-hosted inference server on port {INFERENCE_PORT} with waitress ({INFERENCE_THREADS} threads)")
+    serve(application, host='0.0.0.0', port=INFERENCE_PORT, threads=INFERENCE_THREADS)
+
+if __name__ == '__main__':
+    main()
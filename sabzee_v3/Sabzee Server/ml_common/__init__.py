@@ -0,0 +1,6 @@
+"""Helpers shared by the Python inference services (plant disease and yield prediction).
+
+Both services import this package, so when they are co-hosted in one process
+(see inference_server.py) they share a single HTTP connection pool, metrics
+registry and set of inference pools.
+"""
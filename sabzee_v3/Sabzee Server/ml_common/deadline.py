@@ -0,0 +1,59 @@
+import os
+import time
+
+# Header carrying the caller's remaining time budget in milliseconds. A relative
+# budget is used instead of an absolute timestamp so clock skew between hosts doesn't matter.
+DEADLINE_HEADER = 'X-Request-Timeout-Ms'
+# Budget applied when the caller doesn't send one (0 = no deadline)
+DEFAULT_REQUEST_TIMEOUT_MS = int(os.environ.get('DEFAULT_REQUEST_TIMEOUT_MS', '0'))
+# Shortest timeout handed to an upstream call (requests rejects a timeout of 0)
+MIN_UPSTREAM_TIMEOUT = 0.05
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of time between pipeline stages"""
+
+class Deadline:
+    """Time budget for one request, checked between pipeline stages"""
+    
+    def __init__(self, timeout_seconds=None):
+        self.expires_at = time.monotonic() + timeout_seconds if timeout_seconds else None
+    
+    @classmethod
+    def from_headers(cls, headers):
+        """Build a deadline from the request headers, falling back to the default budget"""
+        try:
+            timeout_ms = int(headers.get(DEADLINE_HEADER, DEFAULT_REQUEST_TIMEOUT_MS))
+        except (TypeError, ValueError):
+            timeout_ms = DEFAULT_REQUEST_TIMEOUT_MS
+        return cls(timeout_ms / 1000 if timeout_ms > 0 else None)
+    
+    def remaining(self):
+        """Seconds left, or None if the request has no deadline"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+    
+    def has_at_least(self, seconds):
+        """Whether there is enough time left for a stage expected to take `seconds`"""
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
+    
+    def check(self, stage):
+        """Raise DeadlineExceeded if the budget is used up before `stage` starts"""
+        if self.expired():
+            raise DeadlineExceeded(f"Request deadline exceeded before {stage}")
+    
+    def timeout(self, cap, stage='upstream call', reserve=0.0):
+        """Timeout for an upstream call: `cap` seconds, shortened to the remaining budget.
+
+        `reserve` seconds are held back for the work after the call (e.g. a fallback
+        and the response), so a slow upstream can't use up the whole request.
+        """
+        self.check(stage)
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return max(MIN_UPSTREAM_TIMEOUT, min(cap, remaining - reserve))
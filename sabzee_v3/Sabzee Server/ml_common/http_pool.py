@@ -0,0 +1,23 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Number of pooled connections kept per upstream host (image CDN, OpenWeatherMap)
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '10'))
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Return the process-wide requests session with a pooled connection adapter"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
@@ -0,0 +1,26 @@
+import threading
+
+# Process-wide counters and gauges, reported on the /metrics endpoints
+_counters = {}
+_gauges = {}
+_lock = threading.Lock()
+
+def increment(name, value=1):
+    """Add to a named counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def register_gauge(name, func):
+    """Register a callable whose return value is reported under name (e.g. cache stats)"""
+    with _lock:
+        _gauges[name] = func
+
+def snapshot():
+    """Return the current counters and evaluated gauges"""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    return {
+        'counters': counters,
+        'gauges': {name: func() for name, func in gauges.items()}
+    }
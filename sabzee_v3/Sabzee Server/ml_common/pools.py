@@ -0,0 +1,31 @@
+import os
+import threading
+import time
+from ml_common import metrics
+
+class InferencePool:
+    """Bounds how many requests may run inference on one model at the same time.
+    
+    Each model family gets its own pool, so a burst of slow ResNet forward passes
+    can't take all the worker threads away from the sklearn yield model.
+    """
+    
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self._semaphore = threading.BoundedSemaphore(size)
+    
+    def __enter__(self):
+        start = time.perf_counter()
+        self._semaphore.acquire()
+        metrics.increment(f"pool.{self.name}.acquired")
+        metrics.increment(f"pool.{self.name}.wait_ms", round((time.perf_counter() - start) * 1000, 3))
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._semaphore.release()
+        return False
+
+# Concurrent inference budgets per model family
+TORCH_POOL = InferencePool('torch', int(os.environ.get('TORCH_INFERENCE_WORKERS', '2')))
+SKLEARN_POOL = InferencePool('sklearn', int(os.environ.get('SKLEARN_INFERENCE_WORKERS', '4')))
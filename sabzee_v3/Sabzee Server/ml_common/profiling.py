@@ -0,0 +1,161 @@
+import os
+import io
+import sys
+import hmac
+import time
+import pstats
+import random
+import cProfile
+import logging
+import threading
+import contextlib
+from collections import deque, Counter
+from datetime import datetime
+from flask import Blueprint, request, jsonify, Response
+
+logger = logging.getLogger(__name__)
+
+# Profiling is off unless explicitly enabled, and the admin endpoints also need a token
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILING_ADMIN_TOKEN = os.environ.get('PROFILING_ADMIN_TOKEN', '')
+# Share of predictions run under cProfile when profiling is enabled
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0.01'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+MAX_STORED_PROFILES = 20
+MAX_FLAMEGRAPH_SECONDS = 60
+FLAMEGRAPH_INTERVAL = 0.005  # Seconds between stack samples
+
+_recent_profiles = deque(maxlen=MAX_STORED_PROFILES)
+_torch_traces_pending = 0
+_lock = threading.Lock()
+# Only one cProfile session may be active per process (enforced by Python 3.12+)
+_profile_slot = threading.Lock()
+_null_context = contextlib.nullcontext()
+
+def sampled_profile(name):
+    """Context manager that runs a sampled share of calls under cProfile.
+
+    When profiling is disabled this returns a shared no-op context, so the cost
+    on the request path is a single flag check.
+    """
+    if not PROFILING_ENABLED or random.random() >= PROFILE_SAMPLE_RATE:
+        return _null_context
+    # Skip sampling while another request is being profiled rather than wait for it
+    if not _profile_slot.acquire(blocking=False):
+        return _null_context
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiling tool (e.g. an attached debugger) is already active
+        _profile_slot.release()
+        return _null_context
+    return _profile(name, profiler)
+
+@contextlib.contextmanager
+def _profile(name, profiler):
+    # Note: on Python 3.12+ cProfile is built on sys.monitoring, so the report
+    # includes events from every thread running while this request is profiled
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _profile_slot.release()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(30)
+        with _lock:
+            _recent_profiles.append({
+                'name': name,
+                'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC'),
+                'elapsed_ms': round(elapsed_ms, 3),
+                'stats': output.getvalue()
+            })
+
+def torch_trace(name):
+    """Context manager that records a torch profiler trace if one has been requested"""
+    global _torch_traces_pending
+    if not PROFILING_ENABLED or _torch_traces_pending <= 0:
+        return _null_context
+    with _lock:
+        if _torch_traces_pending <= 0:
+            return _null_context
+        _torch_traces_pending -= 1
+    return _torch_profile(name)
+
+@contextlib.contextmanager
+def _torch_profile(name):
+    from torch.profiler import profile, ProfilerActivity
+    with profile(activities=[ProfilerActivity.CPU], record_shapes=True) as prof:
+        yield
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"torch-{name}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')}.json")
+    prof.export_chrome_trace(path)
+    logger.info(f"Wrote torch profiler trace to {path}")
+
+def _frame_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+def capture_flamegraph(seconds):
+    """Sample every thread's stack for `seconds` and return collapsed-stack text"""
+    own_thread = threading.get_ident()
+    stacks = Counter()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != own_thread:
+                stacks[_frame_stack(frame)] += 1
+        time.sleep(FLAMEGRAPH_INTERVAL)
+    return '\n'.join(f"{stack} {count}" for stack, count in stacks.most_common()) + '\n'
+
+def create_profiling_blueprint(service, torch_traces=False):
+    """Admin-only profiling routes, mounted under /admin/profile"""
+    blueprint = Blueprint(f"{service}_profiling", __name__, url_prefix='/admin/profile')
+
+    @blueprint.before_request
+    def require_admin():
+        if not PROFILING_ENABLED:
+            return jsonify({"error": "Not found"}), 404
+        token = request.headers.get('X-Admin-Token', '')
+        if not PROFILING_ADMIN_TOKEN or not hmac.compare_digest(token.encode('utf-8'), PROFILING_ADMIN_TOKEN.encode('utf-8')):
+            return jsonify({"error": "Forbidden"}), 403
+
+    @blueprint.route('/requests', methods=['GET'])
+    def recent_profiles():
+        with _lock:
+            profiles = list(_recent_profiles)
+        return jsonify({"sample_rate": PROFILE_SAMPLE_RATE, "profiles": profiles}), 200
+
+    @blueprint.route('/flamegraph', methods=['POST'])
+    def flamegraph():
+        try:
+            seconds = min(float(request.args.get('seconds', '10')), MAX_FLAMEGRAPH_SECONDS)
+        except ValueError:
+            return jsonify({"error": "seconds must be a number"}), 400
+        logger.info(f"Capturing {seconds}s flamegraph for {service}")
+        collapsed = capture_flamegraph(seconds)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"flame-{service}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.collapsed")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(collapsed)
+        return Response(collapsed, mimetype='text/plain', headers={'X-Profile-Path': path})
+
+    if torch_traces:
+        @blueprint.route('/torch', methods=['POST'])
+        def request_torch_traces():
+            global _torch_traces_pending
+            try:
+                count = int(request.args.get('count', '1'))
+            except ValueError:
+                return jsonify({"error": "count must be an integer"}), 400
+            with _lock:
+                _torch_traces_pending = max(0, count)
+            return jsonify({"pending_traces": count, "profile_dir": os.path.abspath(PROFILE_DIR)}), 200
+
+    return blueprint
@@ -0,0 +1,159 @@
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Directory for the Parquet result logs. Leave empty to disable logging.
+RESULT_LOG_DIR = os.environ.get('RESULT_LOG_DIR', '')
+RESULT_LOG_BATCH_SIZE = int(os.environ.get('RESULT_LOG_BATCH_SIZE', '500'))
+RESULT_LOG_FLUSH_SECONDS = float(os.environ.get('RESULT_LOG_FLUSH_SECONDS', '30'))
+RESULT_LOG_ROTATE_BYTES = int(os.environ.get('RESULT_LOG_ROTATE_BYTES', str(64 * 1024 * 1024)))
+RESULT_LOG_ROTATE_SECONDS = float(os.environ.get('RESULT_LOG_ROTATE_SECONDS', '3600'))
+
+IN_PROGRESS_SUFFIX = '.inprogress'
+ABANDONED_SUFFIX = '.abandoned'
+
+class ResultLog:
+    """Buffered, rotating Parquet log of prediction results.
+
+    `append` only adds to an in-memory buffer. A background thread writes the
+    buffer as one row group every RESULT_LOG_FLUSH_SECONDS, or sooner once
+    RESULT_LOG_BATCH_SIZE records are waiting, so request threads never pay for
+    the Parquet write. The file being written carries an `.inprogress` suffix;
+    it is closed and renamed to `<service>-<timestamp>-<pid>.parquet` once it
+    reaches the size or age limit (checked on every wake-up, even when idle),
+    so readers only ever pick up complete files.
+    """
+
+    def __init__(self, service, directory, fields):
+        self.service = service
+        self.directory = directory
+        self.schema = pa.schema(fields)
+        self._buffer = []
+        self._lock = threading.Lock()        # Guards the buffer
+        self._write_lock = threading.Lock()  # Guards the writer and file rotation
+        self._writer = None
+        self._path = None
+        self._opened_at = 0.0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self._recover_abandoned_files()
+        self._flusher = threading.Thread(target=self._run, name=f"{service}-result-log", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def append(self, record):
+        """Buffer one result; writing happens on the background flusher thread"""
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) >= RESULT_LOG_BATCH_SIZE:
+                self._wake.set()
+
+    def flush(self):
+        with self._write_lock:
+            self._flush_locked()
+
+    def close(self):
+        self._stopped.set()
+        self._wake.set()
+        with self._write_lock:
+            self._flush_locked()
+            self._close_writer_locked()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(RESULT_LOG_FLUSH_SECONDS)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            with self._write_lock:
+                self._flush_locked()
+                if self._writer is not None and self._should_rotate():
+                    self._close_writer_locked()
+
+    def _should_rotate(self):
+        return (os.path.getsize(self._path) >= RESULT_LOG_ROTATE_BYTES or
+                time.monotonic() - self._opened_at >= RESULT_LOG_ROTATE_SECONDS)
+
+    def _flush_locked(self):
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        if not records:
+            return
+        try:
+            if self._writer is None:
+                self._open_writer_locked()
+            table = pa.Table.from_pylist(records, schema=self.schema)
+            self._writer.write_table(table)
+        except Exception as e:
+            # Analytics logging must never break a prediction
+            logger.error(f"Error writing {len(records)} records to result log: {str(e)}")
+
+    def _open_writer_locked(self):
+        name = f"{self.service}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')}-{os.getpid()}.parquet"
+        self._path = os.path.join(self.directory, name + IN_PROGRESS_SUFFIX)
+        self._writer = pq.ParquetWriter(self._path, self.schema, compression='snappy')
+        self._opened_at = time.monotonic()
+
+    def _close_writer_locked(self):
+        if self._writer is None:
+            return
+        try:
+            self._writer.close()
+            os.replace(self._path, self._path[:-len(IN_PROGRESS_SUFFIX)])
+        except Exception as e:
+            logger.error(f"Error closing result log {self._path}: {str(e)}")
+        self._writer = None
+        self._path = None
+
+    def _recover_abandoned_files(self):
+        """Report `.inprogress` files left by a process that was killed before closing them.
+
+        Such files have no Parquet footer and can't be read, so they are renamed
+        to `.abandoned` to keep them out of the way of readers and of this check.
+        """
+        for name in os.listdir(self.directory):
+            if not name.endswith(IN_PROGRESS_SUFFIX):
+                continue
+            pid = name[:-len('.parquet' + IN_PROGRESS_SUFFIX)].rsplit('-', 1)[-1]
+            if os.name != 'nt' and pid.isdigit() and _process_alive(int(pid)):
+                continue  # Still being written by another live process
+            path = os.path.join(self.directory, name)
+            try:
+                os.replace(path, path[:-len(IN_PROGRESS_SUFFIX)] + ABANDONED_SUFFIX)
+            except OSError:
+                continue  # Windows refuses to rename a file another process still has open
+            logger.warning(f"Found unfinished result log {path} from a previous run, marked it abandoned")
+
+def _process_alive(pid):
+    """POSIX only: on Windows os.kill(pid, 0) would terminate the process"""
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # Exists but owned by someone else (or not checkable on this platform)
+    return True
+
+def create_result_log(service, fields):
+    """Return a ResultLog for the service, or None if logging is disabled or pyarrow is missing"""
+    if not RESULT_LOG_DIR:
+        return None
+    if pa is None:
+        logger.warning("RESULT_LOG_DIR is set but pyarrow is not installed, result logging disabled")
+        return None
+    return ResultLog(service, os.path.join(RESULT_LOG_DIR, service), fields)
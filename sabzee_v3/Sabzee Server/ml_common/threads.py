@@ -0,0 +1,66 @@
+import os
+import sys
+
+CPU_COUNT = os.cpu_count() or 1
+
+# Per-worker thread budgets. Each concurrent forward pass gets its share of the
+# cores, so TORCH_INFERENCE_WORKERS x TORCH_NUM_THREADS doesn't exceed the CPU count.
+TORCH_NUM_THREADS = int(os.environ.get(
+    'TORCH_NUM_THREADS',
+    max(1, CPU_COUNT // int(os.environ.get('TORCH_INFERENCE_WORKERS', '2')))
+))
+TORCH_INTEROP_THREADS = int(os.environ.get('TORCH_INTEROP_THREADS', '1'))
+# numpy only does small vector work here, so BLAS/OpenMP pools default to one thread
+BLAS_NUM_THREADS = int(os.environ.get('BLAS_NUM_THREADS', '1'))
+# n_jobs for sklearn estimators; joblib workers per single-row predict are pure overhead
+SKLEARN_N_JOBS = int(os.environ.get('SKLEARN_N_JOBS', '1'))
+
+BLAS_ENV_VARS = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS']
+
+_env_limits_applied = False
+
+def apply_env_thread_limits():
+    """Set the OpenMP/MKL/BLAS thread limits. Must run before numpy or torch is imported.
+    
+    Values already set in the environment are left alone.
+    """
+    global _env_limits_applied
+    if _env_limits_applied:
+        return
+    _env_limits_applied = True
+    if 'numpy' in sys.modules or 'torch' in sys.modules:
+        import logging
+        logging.getLogger(__name__).warning("Thread limits applied after numpy/torch import and may be ignored")
+    for var in BLAS_ENV_VARS:
+        os.environ.setdefault(var, str(BLAS_NUM_THREADS))
+
+def configure_torch(num_threads=None):
+    """Apply the torch intra-op (and, once per process, inter-op) thread budget"""
+    import torch
+    torch.set_num_threads(num_threads or TORCH_NUM_THREADS)
+    try:
+        torch.set_num_interop_threads(TORCH_INTEROP_THREADS)
+    except RuntimeError:
+        # Can only be set once, before any inter-op parallel work has started
+        pass
+
+def configure_sklearn(estimator):
+    """Apply the sklearn n_jobs budget to a fitted estimator that supports it"""
+    if hasattr(estimator, 'n_jobs'):
+        estimator.n_jobs = SKLEARN_N_JOBS
+    return estimator
+
+def thread_report():
+    """Return the configured and effective thread budgets, for /health"""
+    report = {
+        'cpu_count': CPU_COUNT,
+        'blas': {var: os.environ.get(var) for var in BLAS_ENV_VARS},
+        'sklearn_n_jobs': SKLEARN_N_JOBS
+    }
+    if 'torch' in sys.modules:
+        torch = sys.modules['torch']
+        report['torch'] = {
+            'num_threads': torch.get_num_threads(),
+            'interop_threads': torch.get_num_interop_threads()
+        }
+    return report
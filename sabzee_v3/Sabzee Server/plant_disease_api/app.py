@@ -1,8 +1,17 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from model import load_model, predict_disease, mock_predict_disease
+from model import load_model, load_image_from_url, predict_image, mock_predict_disease
+from ml_common import metrics, threads
+from ml_common.pools import TORCH_POOL
+from ml_common.deadline import Deadline, DeadlineExceeded
+from ml_common.result_log import create_result_log, pa
+from ml_common.profiling import create_profiling_blueprint, sampled_profile
+from screening import screen_image, IMAGE_SCREENING_ENABLED
+from similarity import SimilarityIndex, SIMILARITY_INDEX_DIR, SIMILAR_CASES_K, NEAR_DUPLICATE_THRESHOLD
 import os
+import time
 import logging
+from datetime import datetime
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -10,22 +19,62 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+app.register_blueprint(create_profiling_blueprint('disease', torch_traces=True))
 
 # Global variables
 model = None
 device = None
 use_mock = False
+similarity_index = None
+
+# Optional Parquet log of every prediction for analytics (see ml_common/result_log.py)
+result_log = create_result_log('disease', [
+    ('timestamp', pa.timestamp('ms')),
+    ('image_url', pa.string()),
+    ('status', pa.string()),
+    ('crop', pa.string()),
+    ('prediction', pa.string()),
+    ('confidence', pa.float64()),
+    ('is_mock', pa.bool_()),
+    ('near_duplicate', pa.bool_()),
+    ('screening_reasons', pa.string()),
+    ('screening_flags', pa.string()),
+    ('latency_ms', pa.float64())
+] if pa is not None else [])
+
+def log_result(start_time, image_url, status, result=None, screening=None):
+    """Append one prediction outcome to the result log, if enabled"""
+    if result_log is None:
+        return
+    result = result or {}
+    result_log.append({
+        'timestamp': datetime.utcnow(),
+        'image_url': image_url,
+        'status': status,
+        'crop': result.get('crop'),
+        'prediction': result.get('prediction'),
+        'confidence': result.get('confidence'),
+        'is_mock': result.get('is_mock'),
+        'near_duplicate': result.get('near_duplicate'),
+        'screening_reasons': ','.join(screening['reasons']) if screening else None,
+        'screening_flags': ','.join(screening['flags']) if screening else None,
+        'latency_ms': round((time.perf_counter() - start_time) * 1000, 3)
+    })
 
 # Load model at startup
 @app.before_first_request
 def load_model_before_first_request():
-    global model, device, use_mock
+    global model, device, use_mock, similarity_index
+    if model is not None or use_mock:
+        return  # Already loaded (e.g. eagerly by the co-hosted inference server)
     try:
         # Try different possible paths for the model
+        # Resolve relative to this file so the lookup works from any working directory
+        base_dir = os.path.dirname(os.path.abspath(__file__))
         possible_paths = [
-            os.path.abspath('../../plantDisease.pth'),
-            os.path.abspath('../plantDisease.pth'),
-            os.path.abspath('plantDisease.pth'),
+            os.path.abspath(os.path.join(base_dir, '../../plantDisease.pth')),
+            os.path.abspath(os.path.join(base_dir, '../plantDisease.pth')),
+            os.path.join(base_dir, 'plantDisease.pth'),
             'C:/Users/Muskaan/Downloads/Client/plantDisease.pth'
         ]
         
@@ -43,6 +92,9 @@ def load_model_before_first_request():
         logger.info(f"Loading model from: {model_path}")
         model, device = load_model(model_path)
         logger.info(f"Model loaded successfully to device: {device}")
+        
+        if SIMILARITY_INDEX_DIR:
+            similarity_index = SimilarityIndex(SIMILARITY_INDEX_DIR)
     except Exception as e:
         logger.error(f"Error loading model: {str(e)}")
         logger.warning("Using mock predictions as fallback.")
@@ -53,14 +105,33 @@ def predict():
     if 'image_url' not in request.json:
         return jsonify({"error": "No image URL provided"}), 400
     
+    start_time = time.perf_counter()
+    screening = None
     try:
         image_url = request.json['image_url']
+        deadline = Deadline.from_headers(request.headers)
         logger.info(f"Received prediction request for image: {image_url}")
         
+        metrics.increment('disease.requests')
         if use_mock:
             predicted_class, confidence = mock_predict_disease(image_url)
         else:
-            predicted_class, confidence = predict_disease(image_url, model, device)
+            # Download and screen outside the inference pool so unusable images never queue for the model
+            image = load_image_from_url(image_url, deadline)
+            if IMAGE_SCREENING_ENABLED:
+                screening = screen_image(image)
+                if screening['rejected']:
+                    logger.info(f"Image rejected by pre-screening: {screening}")
+                    log_result(start_time, image_url, 'rejected', screening=screening)
+                    return jsonify({"error": "Image rejected by pre-screening", "screening": screening}), 422
+            
+            with TORCH_POOL, sampled_profile('disease.predict'):
+                if similarity_index is not None:
+                    predicted_class, confidence, embedding = predict_image(
+                        image, model, device, return_embedding=True, deadline=deadline
+                    )
+                else:
+                    predicted_class, confidence = predict_image(image, model, device, deadline=deadline)
         
         # Split the class name
         parts = predicted_class.split('___')
@@ -74,11 +145,44 @@ def predict():
             "is_mock": use_mock
         }
         
+        if screening is not None:
+            result["screening_flags"] = screening['flags']
+        
+        if similarity_index is not None and not use_mock:
+            # Index problems (disk full, permissions, corrupt rows) must not cost us the real prediction
+            try:
+                similar_cases = similarity_index.search(embedding, SIMILAR_CASES_K)
+                near_duplicate = bool(similar_cases) and similar_cases[0]['similarity'] >= NEAR_DUPLICATE_THRESHOLD
+                if near_duplicate:
+                    metrics.increment('disease.near_duplicates')
+                else:
+                    # Only distinct images are indexed so repeated photos don't crowd out other cases
+                    similarity_index.add(embedding, {
+                        "image_url": image_url,
+                        "prediction": disease,
+                        "crop": crop,
+                        "confidence": round(confidence, 4)
+                    })
+                result["similar_cases"] = similar_cases
+                result["near_duplicate"] = near_duplicate
+            except Exception as e:
+                logger.error(f"Error using similarity index: {str(e)}")
+                metrics.increment('disease.similarity_errors')
+        
         logger.info(f"Prediction result: {result}")
+        log_result(start_time, image_url, 'ok', result, screening)
         return jsonify(result)
+    
+    except DeadlineExceeded as e:
+        # The caller has given up, so don't spend more time on a fallback answer
+        logger.warning(f"Prediction abandoned: {str(e)}")
+        metrics.increment('disease.deadline_exceeded')
+        log_result(start_time, request.json['image_url'], 'deadline_exceeded', screening=screening)
+        return jsonify({"error": str(e)}), 504
         
     except Exception as e:
         logger.error(f"Error during prediction: {str(e)}")
+        metrics.increment('disease.errors')
         # Fallback to mock prediction if real prediction fails
         try:
             predicted_class, confidence = mock_predict_disease(request.json['image_url'])
@@ -95,13 +199,18 @@ def predict():
             }
             
             logger.info(f"Fallback to mock prediction: {result}")
+            log_result(start_time, request.json['image_url'], 'fallback', result, screening)
             return jsonify(result)
         except Exception as fallback_error:
             return jsonify({"error": str(e), "fallback_error": str(fallback_error)}), 500
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "using_mock": use_mock}), 200
+    return jsonify({"status": "healthy", "using_mock": use_mock, "threads": threads.thread_report()}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return jsonify(metrics.snapshot()), 200
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,75 @@
+"""Benchmark ResNet inference latency across torch thread and worker combinations.
+
+Usage:
+    python benchmark.py [--threads 1,2,4] [--workers 1,2,4] [--requests 64] [--model plantDisease.pth]
+
+For every (threads, workers) pair this runs --requests forward passes on a
+synthetic 128x128 image, with `workers` requests in flight at once, and prints
+throughput and p50/p99 latency. Use it to pick TORCH_NUM_THREADS and
+TORCH_INFERENCE_WORKERS for a host.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from model import PlantDiseaseModel, CLASS_NAMES, threads
+import torch
+
+def parse_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_case(model, num_threads, workers, num_requests):
+    threads.configure_torch(num_threads)
+    image = torch.rand(1, 3, 128, 128)
+    
+    def forward(_):
+        start = time.perf_counter()
+        with torch.no_grad():
+            model(image)
+        return (time.perf_counter() - start) * 1000
+    
+    # Warm up so one-off allocation costs don't skew the first case
+    for _ in range(3):
+        forward(None)
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = list(executor.map(forward, range(num_requests)))
+    elapsed = time.perf_counter() - start
+    
+    return {
+        'threads': num_threads,
+        'workers': workers,
+        'throughput': num_requests / elapsed,
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep torch thread and worker budgets")
+    parser.add_argument('--threads', type=parse_list, default=[1, 2, 4], help="Comma-separated torch intra-op thread counts")
+    parser.add_argument('--workers', type=parse_list, default=[1, 2, 4], help="Comma-separated concurrent request counts")
+    parser.add_argument('--requests', type=int, default=64, help="Forward passes per combination")
+    parser.add_argument('--model', help="Optional path to plantDisease.pth (random weights otherwise)")
+    args = parser.parse_args()
+    
+    model = PlantDiseaseModel(num_classes=len(CLASS_NAMES))
+    if args.model:
+        model.load_state_dict(torch.load(args.model, map_location='cpu'))
+    model.eval()
+    
+    print(f"CPU count: {threads.CPU_COUNT}")
+    print(f"{'threads':>8} {'workers':>8} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for num_threads in args.threads:
+        for workers in args.workers:
+            result = run_case(model, num_threads, workers, args.requests)
+            print(f"{result['threads']:>8} {result['workers']:>8} {result['throughput']:>8.1f} "
+                  f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+if __name__ == '__main__':
+    main()
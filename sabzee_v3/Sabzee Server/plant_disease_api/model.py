@@ -1,3 +1,12 @@
+import os
+import sys
+
+# Make the shared ml_common package (one level up) importable and apply the
+# thread budgets before torch initialises its OpenMP/MKL pools
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_common import threads
+threads.apply_env_thread_limits()
+
 import torch
 import torch.nn as nn
 from torchvision import transforms, models
@@ -6,6 +15,9 @@ import requests
 from io import BytesIO
 import logging
 import random
+from ml_common.http_pool import get_session
+from ml_common.deadline import Deadline, DeadlineExceeded
+from ml_common import profiling
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -19,18 +31,50 @@ class PlantDiseaseModel(nn.Module):
         num_ftrs = self.network.fc.in_features
         self.network.fc = nn.Linear(num_ftrs, num_classes)
         
-    def forward(self, xb):
-        out = self.network(xb)
+    def embed(self, xb):
+        # Same as resnet34.forward up to (and including) global pooling,
+        # i.e. the penultimate 512-d features that feed the classifier
+        net = self.network
+        x = net.maxpool(net.relu(net.bn1(net.conv1(xb))))
+        x = net.layer4(net.layer3(net.layer2(net.layer1(x))))
+        return torch.flatten(net.avgpool(x), 1)
+        
+    def forward(self, xb, return_embedding=False):
+        embedding = self.embed(xb)
+        out = self.network.fc(embedding)
+        if return_embedding:
+            return out, embedding
         return out
 
+# Images are decoded at no less than this size (see Image.draft)
+DECODE_SIZE = 256
+
 # Helper function to load image from URL
-def load_image_from_url(url):
+def load_image_from_url(url, deadline=None):
+    deadline = deadline or Deadline()
+    timeout = deadline.timeout(10, 'image download')
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        img = Image.open(BytesIO(response.content)).convert('RGB')
+        # Stream the body so the download is abandoned as soon as the deadline passes
+        with get_session().get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            content = BytesIO()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                deadline.check('image download')
+                content.write(chunk)
+        content.seek(0)
+        img = Image.open(content)
+        original_size = img.size
+        # Let JPEG decode at a reduced scale; the model only needs a 128px short side
+        img.draft('RGB', (DECODE_SIZE, DECODE_SIZE))
+        img = img.convert('RGB')
+        img.info['original_size'] = original_size
         return img
+    except DeadlineExceeded:
+        logger.warning(f"Abandoned image download after deadline: {url}")
+        raise
     except requests.exceptions.RequestException as e:
+        if deadline.expired():
+            raise DeadlineExceeded(f"Request deadline exceeded during image download: {str(e)}")
         logger.error(f"Error loading image from URL: {str(e)}")
         raise Exception(f"Failed to load image from URL: {str(e)}")
     except Exception as e:
@@ -94,6 +138,9 @@ def load_model(model_path):
         device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         logger.info(f"Using device: {device}")
         
+        threads.configure_torch()
+        logger.info(f"Torch using {torch.get_num_threads()} intra-op threads")
+        
         model = PlantDiseaseModel(num_classes=len(CLASS_NAMES))
         logger.info("Model architecture created")
         
@@ -110,18 +157,26 @@ def load_model(model_path):
         raise
 
 # Predict disease
-def predict_disease(image_url, model, device):
+def predict_disease(image_url, model, device, return_embedding=False, deadline=None):
+    """Return (predicted_class, confidence), plus a float16 L2-normalized embedding if requested"""
+    deadline = deadline or Deadline()
+    logger.info(f"Loading image from URL: {image_url}")
+    image = load_image_from_url(image_url, deadline)
+    return predict_image(image, model, device, return_embedding, deadline)
+
+def predict_image(image, model, device, return_embedding=False, deadline=None):
+    """Run the model on an already loaded PIL image, see predict_disease"""
+    deadline = deadline or Deadline()
     try:
-        logger.info(f"Loading image from URL: {image_url}")
-        image = load_image_from_url(image_url)
-        
         logger.info("Transforming image for model input")
         transform = get_transforms()
         img_tensor = transform(image).unsqueeze(0).to(device)
         
+        # Don't spend a forward pass on a request the caller has already given up on
+        deadline.check('inference')
         logger.info("Running prediction")
-        with torch.no_grad():
-            outputs = model(img_tensor)
+        with torch.no_grad(), profiling.torch_trace('forward'):
+            outputs, embedding = model(img_tensor, return_embedding=True)
             _, preds = torch.max(outputs, 1)
             predicted_idx = preds[0].item()
             
@@ -135,6 +190,9 @@ def predict_disease(image_url, model, device):
             confidence = confidence_scores[predicted_idx].item()
         
         logger.info(f"Prediction complete: {predicted_class} with confidence {confidence:.4f}")
+        if return_embedding:
+            embedding = torch.nn.functional.normalize(embedding, dim=1)[0]
+            return predicted_class, confidence, embedding.cpu().numpy().astype('float16')
         return predicted_class, confidence
         
     except Exception as e:
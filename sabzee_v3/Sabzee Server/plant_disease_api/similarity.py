@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the similar-case index. Leave empty to disable the feature.
+SIMILARITY_INDEX_DIR = os.environ.get('SIMILARITY_INDEX_DIR', '')
+# Number of similar past cases returned with each prediction
+SIMILAR_CASES_K = int(os.environ.get('SIMILAR_CASES_K', '3'))
+# Cosine similarity above which a submission is treated as a near-duplicate
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', '0.97'))
+
+EMBEDDING_DIM = 512  # ResNet34 penultimate features
+SEARCH_CHUNK = 8192  # Rows converted to float32 at a time during search
+
+class SimilarityIndex:
+    """Append-only on-disk index of past prediction embeddings.
+
+    Embeddings are stored as raw float16 rows in `embeddings.f16` and the matching
+    case metadata as one JSON object per line in `cases.jsonl`. Both files are only
+    ever appended to, so inserts are cheap and the index survives restarts.
+    Vectors are L2-normalized, so search is a chunked dot product over the matrix.
+    """
+
+    def __init__(self, directory, dim=EMBEDDING_DIM):
+        self.directory = directory
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, 'embeddings.f16')
+        self.cases_path = os.path.join(directory, 'cases.jsonl')
+        self._lock = threading.Lock()
+        self._vectors = np.empty((1024, dim), dtype=np.float16)
+        self._cases = []
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self._cases)
+
+    def _load(self):
+        vectors = np.empty((0, self.dim), dtype=np.float16)
+        if os.path.exists(self.vectors_path):
+            vectors = np.fromfile(self.vectors_path, dtype=np.float16)
+            vectors = vectors[:len(vectors) // self.dim * self.dim].reshape(-1, self.dim)
+
+        cases = []
+        if os.path.exists(self.cases_path):
+            with open(self.cases_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        cases.append(json.loads(line))
+
+        # A crash between the two appends can leave one file a row ahead
+        count = min(len(vectors), len(cases))
+        if count != len(vectors) or count != len(cases):
+            logger.warning(f"Similarity index files out of sync, keeping the first {count} cases")
+            vectors = vectors[:count]
+            cases = cases[:count]
+            vectors.tofile(self.vectors_path)
+            with open(self.cases_path, 'w', encoding='utf-8') as f:
+                for case in cases:
+                    f.write(json.dumps(case) + '\n')
+
+        self._ensure_capacity(count)
+        self._vectors[:count] = vectors
+        self._cases = cases
+        logger.info(f"Loaded similarity index with {count} cases from {self.directory}")
+
+    def _ensure_capacity(self, size):
+        if size <= len(self._vectors):
+            return
+        capacity = len(self._vectors)
+        while capacity < size:
+            capacity *= 2
+        grown = np.empty((capacity, self.dim), dtype=np.float16)
+        grown[:len(self._cases)] = self._vectors[:len(self._cases)]
+        self._vectors = grown
+
+    def add(self, embedding, case):
+        """Insert one embedding with its case metadata (image_url, prediction, ...)"""
+        embedding = np.asarray(embedding, dtype=np.float16).reshape(self.dim)
+        case = dict(case, added_at=time.time())
+        with self._lock:
+            count = len(self._cases)
+            self._ensure_capacity(count + 1)
+            self._vectors[count] = embedding
+            self._cases.append(case)
+            with open(self.vectors_path, 'ab') as f:
+                f.write(embedding.tobytes())
+            with open(self.cases_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(case) + '\n')
+
+    def search(self, embedding, k=SIMILAR_CASES_K):
+        """Return up to k most similar past cases, each with a `similarity` score"""
+        query = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            count = len(self._cases)
+            vectors = self._vectors
+            cases = self._cases
+        if count == 0 or k <= 0:
+            return []
+
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SEARCH_CHUNK):
+            end = min(start + SEARCH_CHUNK, count)
+            scores[start:end] = vectors[start:end].astype(np.float32) @ query
+
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [dict(cases[i], similarity=round(float(scores[i]), 4)) for i in top]
@@ -6,7 +6,10 @@ const Prediction = require('../models/Prediction');
 const { protect, authorize } = require('../middleware/auth');
 
 // Configuration
-const FLASK_API_URL = 'http://localhost:5001';
+const FLASK_API_URL = process.env.PLANT_DISEASE_API_URL || 'http://localhost:5001';
+const FLASK_API_TIMEOUT_MS = 15000; // 15-second timeout
+// Budget sent to the Python service, a little under our own timeout so it gives up first
+const FLASK_API_DEADLINE_MS = FLASK_API_TIMEOUT_MS - 500;
 const USE_MOCK_API = true; // Set to true to use mock data if Python API is not available
 
 // @route   POST api/predictions
@@ -34,7 +37,11 @@ router.post('/',
         console.log(`Sending request to ${FLASK_API_URL}/predict with image URL: ${imageUrl}`);
         const flaskResponse = await axios.post(`${FLASK_API_URL}/predict`, {
           image_url: imageUrl
-        }, { timeout: 15000 }); // 15-second timeout
+        }, {
+          timeout: FLASK_API_TIMEOUT_MS,
+          // Tell the Python service how long we will wait so it can stop work we won't use
+          headers: { 'X-Request-Timeout-Ms': FLASK_API_DEADLINE_MS }
+        });
 
         // Check if the response is from the mock prediction in Python API
         isMockPrediction = flaskResponse.data.is_mock === true;
@@ -51,6 +58,11 @@ router.post('/',
         console.log('Received prediction from Python API:', predictionResult);
       } catch (apiError) {
         console.error('Error connecting to Python API:', apiError.message);
+
+        // The image itself was rejected (blank, blurred, too small), so a mock answer would be misleading
+        if (apiError.response && apiError.response.status === 422) {
+          throw apiError;
+        }
         
         if (USE_MOCK_API) {
           // Fallback to mock prediction if Python API is not available
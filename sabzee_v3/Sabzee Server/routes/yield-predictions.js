@@ -6,7 +6,10 @@ const YieldPrediction = require('../models/YieldPrediction');
 const { protect, authorize } = require('../middleware/auth');
 
 // Configuration
-const FLASK_API_URL = 'http://localhost:5002';
+const FLASK_API_URL = process.env.YIELD_PREDICTION_API_URL || 'http://localhost:5002';
+const FLASK_API_TIMEOUT_MS = 15000; // 15-second timeout
+// Budget sent to the Python service, a little under our own timeout so it gives up first
+const FLASK_API_DEADLINE_MS = FLASK_API_TIMEOUT_MS - 500;
 const USE_MOCK_API = true; // Set to true to use mock data if Python API is not available
 
 // @route   POST api/yield-predictions
@@ -52,7 +55,11 @@ router.post('/',
           season,
           area_of_land,
           soil_type
-        }, { timeout: 15000 }); // 15-second timeout
+        }, {
+          timeout: FLASK_API_TIMEOUT_MS,
+          // Tell the Python service how long we will wait so it can stop work we won't use
+          headers: { 'X-Request-Timeout-Ms': FLASK_API_DEADLINE_MS }
+        });
 
         // Check if the response is from the mock prediction in Python API
         isMockPrediction = flaskResponse.data.is_mock === true;
@@ -1,8 +1,14 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from model import initialize_model
+from model import initialize_model, InvalidInputError
+from ml_common import metrics, threads
+from ml_common.deadline import Deadline, DeadlineExceeded
+from ml_common.result_log import create_result_log, pa
+from ml_common.profiling import create_profiling_blueprint, sampled_profile
 import os
+import time
 import logging
+from datetime import datetime
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -10,6 +16,7 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+app.register_blueprint(create_profiling_blueprint('yield'))
 
 # Global variables
 yield_model = None
@@ -18,47 +25,178 @@ yield_model = None
 @app.before_first_request
 def load_model_before_first_request():
     global yield_model
+    if yield_model is not None:
+        return  # Already loaded (e.g. eagerly by the co-hosted inference server)
     try:
         logger.info("Loading yield prediction model")
         yield_model = initialize_model()
+        metrics.register_gauge('yield.response_cache', yield_model.response_cache.stats)
         logger.info("Yield prediction model loaded successfully")
     except Exception as e:
         logger.error(f"Error loading yield prediction model: {str(e)}")
         raise
 
+REQUIRED_FIELDS = ['latitude', 'longitude', 'crop', 'season', 'area_of_land', 'soil_type']
+# Upper bound on items per /predict/batch request (each may need its own weather lookup)
+MAX_BATCH_ITEMS = int(os.environ.get('YIELD_MAX_BATCH_ITEMS', '100'))
+
+# Optional Parquet log of every prediction for analytics (see ml_common/result_log.py)
+result_log = create_result_log('yield', [
+    ('timestamp', pa.timestamp('ms')),
+    ('status', pa.string()),
+    ('crop', pa.string()),
+    ('season', pa.string()),
+    ('soil_type', pa.string()),
+    ('area_of_land', pa.float64()),
+    ('latitude', pa.float64()),
+    ('longitude', pa.float64()),
+    ('predicted_yield_kg', pa.int64()),
+    ('confidence', pa.float64()),
+    ('is_mock', pa.bool_()),
+    ('cache_hit', pa.bool_()),
+    ('weather_source', pa.string()),
+    ('temperature', pa.float64()),
+    ('humidity', pa.float64()),
+    ('rainfall', pa.float64()),
+    ('latency_ms', pa.float64())
+] if pa is not None else [])
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def log_result(start_time, data, status, result=None):
+    """Append one prediction outcome to the result log, if enabled"""
+    if result_log is None:
+        return
+    result = result or {}
+    weather = result.get('weather', {})
+    result_log.append({
+        'timestamp': datetime.utcnow(),
+        'status': status,
+        'crop': str(data.get('crop')),
+        'season': str(data.get('season')),
+        'soil_type': str(data.get('soil_type')),
+        'area_of_land': _as_float(data.get('area_of_land')),
+        'latitude': _as_float(data.get('latitude')),
+        'longitude': _as_float(data.get('longitude')),
+        'predicted_yield_kg': result.get('predicted_yield_kg'),
+        'confidence': result.get('confidence'),
+        'is_mock': result.get('is_mock'),
+        'cache_hit': result.get('cache_hit'),
+        'weather_source': result.get('weather_source'),
+        'temperature': weather.get('temperature'),
+        'humidity': weather.get('humidity'),
+        'rainfall': weather.get('rainfall'),
+        'latency_ms': round((time.perf_counter() - start_time) * 1000, 3)
+    })
+
+def format_prediction(result):
+    """Select the fields returned to clients from a model result"""
+    return {
+        "predicted_yield_kg": result['predicted_yield_kg'],
+        "suggested_crops": result['suggested_crops'],
+        "confidence": result['confidence'],
+        "is_mock": result['is_mock'],
+        "weather": {
+            "temperature": result['weather']['temperature'],
+            "humidity": result['weather']['humidity'],
+            "rainfall": result['weather']['rainfall']
+        }
+    }
+
 @app.route('/predict', methods=['POST'])
 def predict():
     if not request.json:
         return jsonify({"error": "No data provided"}), 400
+    if not isinstance(request.json, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
     
-    required_fields = ['latitude', 'longitude', 'crop', 'season', 'area_of_land', 'soil_type']
-    for field in required_fields:
+    for field in REQUIRED_FIELDS:
         if field not in request.json:
             return jsonify({"error": f"Missing required field: {field}"}), 400
     
+    start_time = time.perf_counter()
     try:
         logger.info(f"Received yield prediction request: {request.json}")
         
         # Call the prediction model
-        result = yield_model.predict_yield(request.json)
+        deadline = Deadline.from_headers(request.headers)
+        metrics.increment('yield.requests')
+        with sampled_profile('yield.predict'):
+            result = yield_model.predict_yield(request.json, deadline)
         
-        prediction_result = {
-            "predicted_yield_kg": result['predicted_yield_kg'],
-            "suggested_crops": result['suggested_crops'],
-            "confidence": result['confidence'],
-            "is_mock": result['is_mock'],
-            "weather": {
-                "temperature": result['weather']['temperature'],
-                "humidity": result['weather']['humidity'],
-                "rainfall": result['weather']['rainfall']
-            }
-        }
+        prediction_result = format_prediction(result)
         
         logger.info(f"Prediction result: {prediction_result}")
+        log_result(start_time, request.json, 'ok', result)
         return jsonify(prediction_result)
+    
+    except DeadlineExceeded as e:
+        logger.warning(f"Prediction abandoned: {str(e)}")
+        metrics.increment('yield.deadline_exceeded')
+        log_result(start_time, request.json, 'deadline_exceeded')
+        return jsonify({"error": str(e)}), 504
+    
+    except InvalidInputError as e:
+        # Invalid input values, e.g. an unknown crop or a non-numeric area
+        logger.warning(f"Invalid prediction request: {str(e)}")
+        log_result(start_time, request.json, 'invalid')
+        return jsonify({"error": str(e)}), 400
         
     except Exception as e:
         logger.error(f"Error during prediction: {str(e)}")
+        metrics.increment('yield.errors')
+        log_result(start_time, request.json, 'error')
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    if not isinstance(request.json, dict) or not isinstance(request.json.get('items'), list):
+        return jsonify({"error": "Expected a JSON body with an 'items' list"}), 400
+    
+    items = request.json['items']
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({"error": f"Too many items, the maximum is {MAX_BATCH_ITEMS}"}), 400
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            return jsonify({"error": f"Item {i} must be a JSON object"}), 400
+        for field in REQUIRED_FIELDS:
+            if field not in item:
+                return jsonify({"error": f"Missing required field: {field} (item {i})"}), 400
+    
+    start_time = time.perf_counter()
+    try:
+        logger.info(f"Received batch yield prediction request with {len(items)} items")
+        metrics.increment('yield.batch_requests')
+        metrics.increment('yield.batch_items', len(items))
+        deadline = Deadline.from_headers(request.headers)
+        with sampled_profile('yield.predict_batch'):
+            results = yield_model.predict_yield_batch(items, deadline)
+        for item, result in zip(items, results):
+            log_result(start_time, item, 'ok', result)
+        return jsonify({"predictions": [format_prediction(r) for r in results]})
+    
+    except DeadlineExceeded as e:
+        logger.warning(f"Batch prediction abandoned: {str(e)}")
+        metrics.increment('yield.deadline_exceeded')
+        for item in items:
+            log_result(start_time, item, 'deadline_exceeded')
+        return jsonify({"error": str(e)}), 504
+    
+    except InvalidInputError as e:
+        logger.warning(f"Invalid batch prediction request: {str(e)}")
+        for item in items:
+            log_result(start_time, item, 'invalid')
+        return jsonify({"error": str(e)}), 400
+        
+    except Exception as e:
+        logger.error(f"Error during batch prediction: {str(e)}")
+        metrics.increment('yield.errors')
+        for item in items:
+            log_result(start_time, item, 'error')
         return jsonify({"error": str(e)}), 500
 
 @app.route('/health', methods=['GET'])
@@ -66,7 +204,9 @@ def health_check():
     if yield_model:
         return jsonify({
             "status": "healthy",
-            "using_mock": yield_model.is_mock
+            "using_mock": yield_model.is_mock,
+            "response_cache": yield_model.response_cache.stats(),
+            "threads": threads.thread_report()
         }), 200
     else:
         return jsonify({
@@ -74,6 +214,10 @@ def health_check():
             "using_mock": True
         }), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return jsonify(metrics.snapshot()), 200
+
 if __name__ == '__main__':
     try:
         logger.info("Starting Flask server on port 5002")
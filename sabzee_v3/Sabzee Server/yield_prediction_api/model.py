@@ -1,17 +1,34 @@
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables from .env file if present
+load_dotenv()
+
+# Make the shared ml_common package (one level up) importable and apply the
+# thread budgets before numpy initialises its BLAS/OpenMP pools
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_common import threads
+threads.apply_env_thread_limits()
+
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 import pickle
-import os
-import requests
 import logging
 import json
 import time
+import hashlib
+import copy
+import threading
+import itertools
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
-
-# Load environment variables from .env file if present
-load_dotenv()
+from ml_common import metrics
+from ml_common.http_pool import get_session
+from ml_common.pools import SKLEARN_POOL
+from ml_common.deadline import Deadline, DeadlineExceeded
+from requests.exceptions import Timeout as RequestTimeout
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -69,19 +86,121 @@ if not OPENWEATHER_API_KEY:
 USE_REAL_WEATHER_API = bool(OPENWEATHER_API_KEY)  # Only use real API if key is provided
 WEATHER_CACHE_DURATION = 900  # Cache weather data for 15 minutes (in seconds)
 weather_cache = {}  # Simple in-memory cache for weather data
+_weather_versions = itertools.count(1)  # Next version for a (re)filled weather cache entry
+# With less time than this left on a request, skip the weather API and answer
+# from the last known (possibly expired) weather for the location instead
+WEATHER_MIN_BUDGET_SECONDS = float(os.environ.get('WEATHER_MIN_BUDGET_SECONDS', '2'))
+# Time kept back from the weather calls for scoring and the response, so a slow
+# weather API leads to the fallback answer rather than a 504
+WEATHER_RESERVE_SECONDS = float(os.environ.get('WEATHER_RESERVE_SECONDS', '0.5'))
+
+# Deterministic mode: all randomness (yield variation, confidence, mock weather)
+# is drawn from a per-request generator seeded from the request content, so the
+# same inputs always produce the same prediction
+DETERMINISTIC_PREDICTIONS = os.environ.get('YIELD_DETERMINISTIC', 'false').lower() in ('1', 'true', 'yes')
+
+class InvalidInputError(ValueError):
+    """Raised for bad request values (unknown category, non-numeric field), as opposed to server-side errors"""
+
+def _parse_float(data, field):
+    """Read a numeric request field, raising InvalidInputError if it isn't a number"""
+    try:
+        return float(data[field])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidInputError(f"Invalid value for {field}: {data.get(field)!r}")
+
+def _seeded_rng(*parts):
+    """Build a NumPy generator seeded from the given (already normalized) values"""
+    digest = hashlib.sha256(repr(parts).encode('utf-8')).digest()
+    return np.random.default_rng(int.from_bytes(digest[:8], 'little'))
+
+def get_request_rng(*parts):
+    """Return the random source for a request: seeded in deterministic mode, global otherwise"""
+    if DETERMINISTIC_PREDICTIONS:
+        return _seeded_rng(*parts)
+    return np.random
+
+# Response cache size (number of predictions). Only used in deterministic mode,
+# since random predictions can't be reused. Set to 0 to disable.
+RESPONSE_CACHE_SIZE = int(os.environ.get('YIELD_CACHE_SIZE', '1024'))
+
+def _store_weather(cache_key, timestamp, data):
+    """Store a weather entry under a new version so dependent cached predictions are invalidated.
+
+    Returns the version, which identifies this exact snapshot of the weather.
+    """
+    # next() on itertools.count is atomic, so concurrent refreshes never share a version
+    version = next(_weather_versions)
+    weather_cache[cache_key] = {
+        'timestamp': timestamp,
+        'data': data,
+        'version': version
+    }
+    return version
+
+class PredictionCache:
+    """Thread-safe LRU cache for prediction results with hit/miss counters"""
+    
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(self._entries[key])
+    
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = copy.deepcopy(value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
 
 class YieldPredictionModel:
     def __init__(self):
         self.model = None
         self.is_mock = True  # Start with mock model by default
-        
-        # Try to load the pre-trained model if it exists
+        self.model_version = 'feature-based'
+        self.response_cache = PredictionCache(RESPONSE_CACHE_SIZE)
+        self.load_model()
+    
+    def load_model(self, model_path=None):
+        """Load the pre-trained model if it exists, falling back to feature-based prediction"""
         try:
-            model_path = self._find_model_file()
+            model_path = model_path or self._find_model_file()
             if model_path:
                 with open(model_path, 'rb') as f:
-                    self.model = pickle.load(f)
+                    self.model = threads.configure_sklearn(pickle.load(f))
                 self.is_mock = False
+                self.model_version = f"{model_path}:{os.path.getmtime(model_path)}"
                 logger.info(f"Loaded pre-trained model from {model_path}")
             else:
                 logger.warning("No pre-trained model found, using feature-based prediction")
@@ -90,13 +209,18 @@ class YieldPredictionModel:
             logger.error(f"Error loading model: {str(e)}")
             logger.warning("Using feature-based prediction as fallback")
             self._create_mock_model()
+        
+        # Cached predictions belong to the previous model
+        self.response_cache.clear()
     
     def _find_model_file(self):
         """Look for model file in various possible locations"""
+        # Resolve relative to this file so the lookup works from any working directory
+        base_dir = os.path.dirname(os.path.abspath(__file__))
         possible_paths = [
-            os.path.abspath('../../yield_prediction_model.pkl'),
-            os.path.abspath('../yield_prediction_model.pkl'),
-            os.path.abspath('yield_prediction_model.pkl'),
+            os.path.abspath(os.path.join(base_dir, '../../yield_prediction_model.pkl')),
+            os.path.abspath(os.path.join(base_dir, '../yield_prediction_model.pkl')),
+            os.path.join(base_dir, 'yield_prediction_model.pkl'),
             'C:/Users/Muskaan/Downloads/Client/yield_prediction_model.pkl'
         ]
         
@@ -112,29 +236,48 @@ class YieldPredictionModel:
         X = np.random.rand(100, 10)  # Random features
         y = np.random.rand(100) * 5000  # Random yield values
         self.model.fit(X, y)
+        self.is_mock = True
+        self.model_version = 'feature-based'
         logger.info("Created simple mock model")
     
-    def _get_weather_data(self, lat, lng):
-        """Get weather data from coordinates using OpenWeatherMap API"""
+    def _get_weather_data(self, lat, lng, rng=None, deadline=None):
+        """Get weather data from coordinates using OpenWeatherMap API.
+
+        Returns (weather_data, version), where version identifies the cached
+        snapshot the data came from, or is None for uncached stand-in data.
+        """
+        deadline = deadline or Deadline()
         # Check if we have cached data for this location
         cache_key = f"{lat:.4f}_{lng:.4f}"
         current_time = time.time()
         
-        if cache_key in weather_cache:
-            cache_entry = weather_cache[cache_key]
+        # Read the entry once so the data and its version always belong together
+        cache_entry = weather_cache.get(cache_key)
+        if cache_entry is not None:
             # If cache is still valid, return the cached data
             if current_time - cache_entry['timestamp'] < WEATHER_CACHE_DURATION:
                 logger.info(f"Using cached weather data for {lat}, {lng}")
-                return cache_entry['data']
+                return cache_entry['data'], cache_entry['version']
+        
+        # Degraded path: not enough time left for the weather API
+        degraded = USE_REAL_WEATHER_API and not deadline.has_at_least(WEATHER_MIN_BUDGET_SECONDS + WEATHER_RESERVE_SECONDS)
+        if degraded:
+            metrics.increment('yield.weather_degraded')
+            if cache_entry is not None:
+                logger.warning(f"Little time left, using last known weather data for {lat}, {lng}")
+                return cache_entry['data'], cache_entry['version']
+            logger.warning(f"Little time left and no weather data for {lat}, {lng}, using mock weather")
         
         # If we get here, we need fresh data
-        if USE_REAL_WEATHER_API and OPENWEATHER_API_KEY:
+        if USE_REAL_WEATHER_API and OPENWEATHER_API_KEY and not degraded:
+            weather_timeout = 15
             try:
                 # Get current weather data 
                 # Using the documented endpoint: https://openweathermap.org/current
                 current_url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lng}&appid={OPENWEATHER_API_KEY}&units=metric"
                 logger.info(f"Requesting current weather data from OpenWeatherMap API for location: {lat}, {lng}")
-                current_response = requests.get(current_url, timeout=15)
+                weather_timeout = deadline.timeout(15, 'weather fetch', reserve=WEATHER_RESERVE_SECONDS)
+                current_response = get_session().get(current_url, timeout=weather_timeout)
                 current_response.raise_for_status()
                 current_data = current_response.json()
                 
@@ -154,11 +297,12 @@ class YieldPredictionModel:
                         rainfall = current_data['rain']['3h']
                 
                 # If no current rainfall, check forecast for precipitation prediction
-                if rainfall == 0:
+                # (skipped when the request doesn't have time for a second API call)
+                if rainfall == 0 and deadline.has_at_least(WEATHER_MIN_BUDGET_SECONDS + WEATHER_RESERVE_SECONDS):
                     try:
                         # Get 5-day forecast data for rainfall prediction
                         forecast_url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lng}&appid={OPENWEATHER_API_KEY}&units=metric"
-                        forecast_response = requests.get(forecast_url, timeout=15)
+                        forecast_response = get_session().get(forecast_url, timeout=deadline.timeout(15, 'forecast fetch', reserve=WEATHER_RESERVE_SECONDS))
                         forecast_response.raise_for_status()
                         forecast_data = forecast_response.json()
                         
@@ -198,13 +342,27 @@ class YieldPredictionModel:
                 }
                 
                 # Cache the result
-                weather_cache[cache_key] = {
-                    'timestamp': current_time,
-                    'data': weather_data
-                }
+                version = _store_weather(cache_key, current_time, weather_data)
                 
                 logger.info(f"Retrieved real weather data: {weather_data}")
-                return weather_data
+                return weather_data, version
+            
+            except DeadlineExceeded:
+                raise
+            
+            except RequestTimeout as e:
+                if weather_timeout >= 15:
+                    logger.error(f"Weather API timed out: {str(e)}")
+                    logger.warning("Falling back to mock weather data")
+                else:
+                    # Timed out on the request's shortened budget, not because the API is down:
+                    # answer like the degraded path and don't cache the stand-in
+                    degraded = True
+                    metrics.increment('yield.weather_degraded')
+                    if cache_entry is not None:
+                        logger.warning(f"Weather API timed out on request deadline, using last known weather data for {lat}, {lng}")
+                        return cache_entry['data'], cache_entry['version']
+                    logger.warning(f"Weather API timed out on request deadline, using mock weather for {lat}, {lng}")
                 
             except Exception as e:
                 logger.error(f"Error fetching weather data from API: {str(e)}")
@@ -212,28 +370,34 @@ class YieldPredictionModel:
                 # Fall through to mock data
         
         # Generate mock weather data as fallback
+        # Mock weather only depends on the location, so seed it from the cache key
+        if rng is None:
+            rng = get_request_rng('weather', cache_key)
         weather_data = {
-            'temperature': round(20 + np.random.rand() * 15, 1),  # 20-35°C
-            'humidity': round(40 + np.random.rand() * 40, 1),     # 40-80%
-            'rainfall': round(50 + np.random.rand() * 150, 1),    # 50-200mm
-            'weather_condition': np.random.choice(['Clear', 'Clouds', 'Rain', 'Drizzle']),
+            'temperature': round(20 + rng.random() * 15, 1),  # 20-35°C
+            'humidity': round(40 + rng.random() * 40, 1),     # 40-80%
+            'rainfall': round(50 + rng.random() * 150, 1),    # 50-200mm
+            'weather_condition': str(rng.choice(['Clear', 'Clouds', 'Rain', 'Drizzle'])),
             'weather_description': 'Simulated weather conditions',
-            'wind_speed': round(2 + np.random.rand() * 8, 1),     # 2-10 m/s
+            'wind_speed': round(2 + rng.random() * 8, 1),     # 2-10 m/s
             'source': 'mock_data',
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
-        # Cache even the mock data to reduce random variations in repeated calls
-        weather_cache[cache_key] = {
-            'timestamp': current_time,
-            'data': weather_data
-        }
+        # Cache even the mock data to reduce random variations in repeated calls,
+        # but not a degraded stand-in that would hide real weather for the next 15 minutes
+        version = None
+        if not degraded:
+            version = _store_weather(cache_key, current_time, weather_data)
         
         logger.info(f"Generated mock weather data: {weather_data}")
-        return weather_data
+        return weather_data, version
     
-    def _calculate_yield_feature_based(self, crop, season, soil_type, area_of_land, weather):
+    def _calculate_yield_feature_based(self, crop, season, soil_type, area_of_land, weather, rng=None):
         """Calculate yield based on features when no ML model is available"""
+        if rng is None:
+            rng = np.random
+
         # Get base yield for crop
         if crop not in BASE_YIELDS:
             logger.warning(f"Unknown crop: {crop}, using average yield")
@@ -293,7 +457,7 @@ class YieldPredictionModel:
         
         # Add small random variation (±5%) for realistic predictions
         # Lower variation than before to make predictions more stable
-        variation = 0.95 + (np.random.rand() * 0.1)  # 0.95-1.05
+        variation = 0.95 + (rng.random() * 0.1)  # 0.95-1.05
         total_yield = round(total_yield * variation)
         
         return total_yield
@@ -356,103 +520,209 @@ class YieldPredictionModel:
         
         return suitable_crops
     
-    def predict_yield(self, data):
+    def predict_yield(self, data, deadline=None):
         """Predict yield based on input data"""
+        # A single request is a batch of one, so both paths always agree
+        return self.predict_yield_batch([data], deadline)[0]
+    
+    def predict_yield_batch(self, items, deadline=None):
+        """Predict yield for a list of inputs, scoring all ML-backed rows in one model call"""
+        deadline = deadline or Deadline()
         try:
-            crop = data['crop']
-            season = data['season']
-            soil_type = data['soil_type']
-            area_of_land = float(data['area_of_land'])
-            latitude = float(data['latitude'])
-            longitude = float(data['longitude'])
-            
-            # Get weather data based on location
-            weather = self._get_weather_data(latitude, longitude)
+            requests_to_score = []
+            results = [None] * len(items)
             
-            # Add location details if available
-            location_details = data.get('location_details', {})
-            
-            if self.is_mock:
-                # Use feature-based prediction when no trained model is available
-                predicted_yield = self._calculate_yield_feature_based(
-                    crop, season, soil_type, area_of_land, weather
+            for i, data in enumerate(items):
+                crop = data['crop']
+                season = data['season']
+                soil_type = data['soil_type']
+                area_of_land = _parse_float(data, 'area_of_land')
+                latitude = _parse_float(data, 'latitude')
+                longitude = _parse_float(data, 'longitude')
+                
+                # Per-request random source, seeded from the normalized request in deterministic mode
+                rng = get_request_rng(
+                    crop, season, soil_type, round(area_of_land, 4),
+                    round(latitude, 4), round(longitude, 4)
                 )
-                confidence = round(0.7 + (np.random.rand() * 0.2), 2)  # 0.7-0.9
-            else:
-                # When we have a trained model
-                # Convert inputs to features the model understands
-                features = self._prepare_features(crop, season, soil_type, area_of_land, weather)
-                predicted_yield = int(self.model.predict([features])[0])
-                confidence = round(0.8 + (np.random.rand() * 0.15), 2)  # 0.8-0.95
-            
-            # Find suitable crops
-            suggested_crops = self._find_suitable_crops(soil_type, season, weather)
-            # Remove the current crop from suggestions if present
-            if crop in suggested_crops:
-                suggested_crops.remove(crop)
                 
-            # Add another suggestion if we removed the current crop
-            if len(suggested_crops) < 3:
-                all_crops = list(CROP_FEATURES.keys())
-                for potential_crop in all_crops:
-                    if potential_crop not in suggested_crops and potential_crop != crop:
-                        suggested_crops.append(potential_crop)
-                        break
+                # Get weather data based on location (copied so the cached entry isn't mutated below)
+                weather, weather_version = self._get_weather_data(latitude, longitude, deadline=deadline)
+                weather = dict(weather)
+                
+                # Add location details if available
+                location_details = data.get('location_details', {})
+                
+                # In deterministic mode the result only depends on the normalized inputs,
+                # the weather snapshot and the model, so repeated requests can be served from cache
+                cache_key = None
+                if DETERMINISTIC_PREDICTIONS and weather_version is not None:
+                    # Keyed on the version of the weather snapshot actually used, so a refresh
+                    # by another thread can't file this result under the newer weather.
+                    # Results from uncached stand-in weather are not cached.
+                    cache_key = (
+                        crop, season, soil_type, round(area_of_land, 4),
+                        f"{latitude:.4f}_{longitude:.4f}", weather_version, self.model_version
+                    )
+                    cached = self.response_cache.get(cache_key)
+                    if cached is not None:
+                        cached['location_details'] = location_details
+                        cached['cache_hit'] = True
+                        results[i] = cached
+                        continue
+                
+                requests_to_score.append({
+                    'index': i,
+                    'crop': crop,
+                    'season': season,
+                    'soil_type': soil_type,
+                    'area_of_land': area_of_land,
+                    'weather': weather,
+                    'location_details': location_details,
+                    'rng': rng,
+                    'cache_key': cache_key
+                })
             
-            # Add additional information about the prediction
-            weather_source = weather.pop('source', 'unknown')
+            scores = self._score(requests_to_score, deadline) if requests_to_score else []
+            for req, (predicted_yield, confidence) in zip(requests_to_score, scores):
+                result = self._build_result(req, predicted_yield, confidence)
+                if req['cache_key'] is not None:
+                    self.response_cache.put(req['cache_key'], {k: v for k, v in result.items() if k != 'location_details'})
+                results[req['index']] = result
             
-            result = {
-                'predicted_yield_kg': predicted_yield,
-                'suggested_crops': suggested_crops[:3],  # Limit to 3 suggestions
-                'confidence': confidence,
-                'weather': weather,
-                'is_mock': self.is_mock,
-                'weather_source': weather_source,
-                'location_details': location_details
-            }
-            
-            return result
+            return results
             
         except Exception as e:
             logger.error(f"Error in yield prediction: {str(e)}")
             raise
     
-    def _prepare_features(self, crop, season, soil_type, area_of_land, weather):
-        """Prepare features for model input"""
-        # This would normally transform categorical variables and normalize features
-        # For the mock implementation, we'll just create a feature vector
+    def _score(self, requests_to_score, deadline):
+        """Return (predicted_yield, confidence) per request, holding an sklearn inference slot"""
+        scores = []
+        # Weather fetches and cache lookups happen before this, outside the pool,
+        # so slow upstream calls can't take the slots away from scoring
+        with SKLEARN_POOL:
+            # Skip scoring if the request ran out of time while queued for a slot
+            deadline.check('yield scoring')
+            if not self.is_mock:
+                # When we have a trained model, encode every pending row into one matrix
+                features = FEATURE_ENCODER.encode_batch([
+                    (r['crop'], r['season'], r['soil_type'], r['area_of_land'], r['weather'])
+                    for r in requests_to_score
+                ])
+                model_yields = self.model.predict(features)
+            
+            for row, req in enumerate(requests_to_score):
+                rng = req['rng']
+                if self.is_mock:
+                    # Use feature-based prediction when no trained model is available
+                    predicted_yield = self._calculate_yield_feature_based(
+                        req['crop'], req['season'], req['soil_type'], req['area_of_land'], req['weather'], rng=rng
+                    )
+                    confidence = round(0.7 + (rng.random() * 0.2), 2)  # 0.7-0.9
+                else:
+                    predicted_yield = int(model_yields[row])
+                    confidence = round(0.8 + (rng.random() * 0.15), 2)  # 0.8-0.95
+                scores.append((predicted_yield, confidence))
+        return scores
+    
+    def _build_result(self, req, predicted_yield, confidence):
+        """Assemble the response for one scored request"""
+        crop = req['crop']
+        weather = req['weather']
         
-        # One-hot encode crop (simplified)
-        crops = list(CROP_FEATURES.keys())
-        crop_feature = [1 if c == crop else 0 for c in crops]
+        # Find suitable crops
+        suggested_crops = self._find_suitable_crops(req['soil_type'], req['season'], weather)
+        # Remove the current crop from suggestions if present
+        if crop in suggested_crops:
+            suggested_crops.remove(crop)
+            
+        # Add another suggestion if we removed the current crop
+        if len(suggested_crops) < 3:
+            for potential_crop in CROP_FEATURES:
+                if potential_crop not in suggested_crops and potential_crop != crop:
+                    suggested_crops.append(potential_crop)
+                    break
         
-        # One-hot encode season
-        seasons = list(SEASON_FACTORS.keys())
-        season_feature = [1 if s == season else 0 for s in seasons]
+        # Add additional information about the prediction
+        weather_source = weather.pop('source', 'unknown')
         
-        # One-hot encode soil type
-        soils = list(SOIL_TYPES.keys())
-        soil_feature = [1 if s == soil_type else 0 for s in soils]
+        return {
+            'predicted_yield_kg': predicted_yield,
+            'suggested_crops': suggested_crops[:3],  # Limit to 3 suggestions
+            'confidence': confidence,
+            'weather': weather,
+            'is_mock': self.is_mock,
+            'weather_source': weather_source,
+            'location_details': req['location_details'],
+            'cache_hit': False
+        }
+    
+class FeatureEncoder:
+    """Feature layout for the yield model, compiled once from the lookup tables.
+    
+    Rows are four normalized numeric features followed by one-hot blocks for crop,
+    season and soil type. Training export and serving both go through this class so
+    the column order can't drift between them.
+    """
+    
+    NUMERIC_FEATURES = ['area_of_land', 'temperature', 'humidity', 'rainfall']
+    
+    def __init__(self, crops, seasons, soil_types):
+        self.crop_index = {c: i for i, c in enumerate(crops)}
+        self.season_index = {s: i for i, s in enumerate(seasons)}
+        self.soil_index = {s: i for i, s in enumerate(soil_types)}
         
-        # Combine all features
-        features = [
-            area_of_land / 10,  # Normalize area
-            weather['temperature'] / 50,  # Normalize temperature
-            weather['humidity'] / 100,  # Normalize humidity
-            weather['rainfall'] / 200,  # Normalize rainfall
-        ]
+        # Column offsets of each one-hot block
+        self.crop_offset = len(self.NUMERIC_FEATURES)
+        self.season_offset = self.crop_offset + len(self.crop_index)
+        self.soil_offset = self.season_offset + len(self.season_index)
+        self.n_features = self.soil_offset + len(self.soil_index)
         
-        # Add one-hot encoded features
-        features.extend(crop_feature)
-        features.extend(season_feature)
-        features.extend(soil_feature)
+        self.feature_names = (
+            list(self.NUMERIC_FEATURES) +
+            [f"crop_{c}" for c in crops] +
+            [f"season_{s}" for s in seasons] +
+            [f"soil_{s}" for s in soil_types]
+        )
+    
+    def encode_into(self, out, crop, season, soil_type, area_of_land, weather):
+        """Write one feature row into a preallocated float32 array"""
+        if crop not in self.crop_index:
+            raise InvalidInputError(f"Unknown crop: {crop}")
+        if season not in self.season_index:
+            raise InvalidInputError(f"Unknown season: {season}")
+        if soil_type not in self.soil_index:
+            raise InvalidInputError(f"Unknown soil type: {soil_type}")
         
-        return features
+        out[:] = 0
+        out[0] = float(area_of_land) / 10  # Normalize area
+        out[1] = weather['temperature'] / 50  # Normalize temperature
+        out[2] = weather['humidity'] / 100  # Normalize humidity
+        out[3] = weather['rainfall'] / 200  # Normalize rainfall
+        out[self.crop_offset + self.crop_index[crop]] = 1
+        out[self.season_offset + self.season_index[season]] = 1
+        out[self.soil_offset + self.soil_index[soil_type]] = 1
+        return out
+    
+    def encode(self, crop, season, soil_type, area_of_land, weather):
+        """Encode a single input as a 1-D float32 row"""
+        row = np.empty(self.n_features, dtype=np.float32)
+        return self.encode_into(row, crop, season, soil_type, area_of_land, weather)
+    
+    def encode_batch(self, rows):
+        """Encode (crop, season, soil_type, area_of_land, weather) tuples into a float32 matrix"""
+        rows = list(rows)
+        matrix = np.empty((len(rows), self.n_features), dtype=np.float32)
+        for i, (crop, season, soil_type, area_of_land, weather) in enumerate(rows):
+            self.encode_into(matrix[i], crop, season, soil_type, area_of_land, weather)
+        return matrix
+
+FEATURE_ENCODER = FeatureEncoder(list(CROP_FEATURES), list(SEASON_FACTORS), list(SOIL_TYPES))
 
 # Initialize the model
 def initialize_model():
     """Initialize and return the yield prediction model"""
     logger.info("Initializing yield prediction model")
     model = YieldPredictionModel()
-    return model 
\ No newline at end of file
+    return model